@@ -0,0 +1,205 @@
+import queue, threading, zipfile
+import numpy as np
+from typing import Dict, Optional
+
+from .models import Request
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAVE_PYARROW = True
+except ImportError:  # parquet output is optional; npz needs only numpy
+    HAVE_PYARROW = False
+
+SOURCE_NAMES = ("renewable", "battery", "nonrenewable")
+_SOURCE_CODES = {k: i for i, k in enumerate(SOURCE_NAMES)}
+
+COLUMNS = (
+    ("req_id", np.int64),
+    ("arrival", np.float64),
+    ("start", np.float64),          # NaN for dropped requests
+    ("finish", np.float64),         # NaN for dropped requests
+    ("chosen_source", np.int8),     # index into SOURCE_NAMES, -1 if never dispatched
+    ("priority", np.int8),
+    ("group", np.int16),            # index into the writer's group names
+    ("dropped", np.bool_),
+)
+
+class EventLogWriter:
+    # per-request log: records go into fixed-size column chunks that a background thread compresses
+    # to disk, so the simulation never waits on I/O and memory stays at (max_pending + 2) chunks
+    def __init__(self, path: str, chunk_size: int = 65536, fmt: str = "auto", max_pending: int = 4):
+        if fmt == "auto":
+            fmt = "parquet" if path.endswith(".parquet") and HAVE_PYARROW else "npz"
+        if fmt not in ("npz", "parquet"):
+            raise ValueError(f"unknown event log format: {fmt}")
+        if fmt == "parquet" and not HAVE_PYARROW:
+            raise ImportError("parquet event logs require pyarrow; use fmt='npz'")
+        self.path = path
+        self.fmt = fmt
+        self.chunk_size = chunk_size
+        self.groups: Dict[str, int] = {}
+        self.records = 0
+        self._cols = self._new_chunk()
+        self._n = 0
+        self._pending: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._free: "queue.Queue" = queue.Queue()
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._worker, name="smartgrid-eventlog", daemon=True)
+        self._thread.start()
+
+    def _new_chunk(self):
+        return {name: np.empty(self.chunk_size, dtype=dt) for name, dt in COLUMNS}
+
+    def record(self, rq: Request, dropped: bool = False):
+        if self._closed:
+            raise RuntimeError("event log writer is closed")
+        c, i = self._cols, self._n
+        c["req_id"][i] = rq.req_id
+        c["arrival"][i] = rq.arrival_time
+        c["start"][i] = np.nan if dropped or rq.start_service_time is None else rq.start_service_time
+        c["finish"][i] = np.nan if dropped or rq.finish_time is None else rq.finish_time
+        c["chosen_source"][i] = -1 if dropped else _SOURCE_CODES.get(rq.chosen_source, -1)
+        c["priority"][i] = rq.priority
+        g = self.groups.get(rq.group)
+        if g is None:
+            g = self.groups[rq.group] = len(self.groups)
+        c["group"][i] = g
+        c["dropped"][i] = dropped
+        self._n += 1
+        self.records += 1
+        if self._n == self.chunk_size:
+            self._submit()
+
+    def _submit(self):
+        # the worker has exited after close(), so a put could block forever
+        if self._closed:
+            raise RuntimeError("event log writer is closed")
+        if self._n == 0:
+            return
+        if self._error is not None:
+            raise RuntimeError("event log writer failed") from self._error
+        # blocks only when the writer is max_pending chunks behind (bounded memory)
+        self._pending.put((self._cols, self._n))
+        try:
+            self._cols = self._free.get_nowait()
+        except queue.Empty:
+            self._cols = self._new_chunk()
+        self._n = 0
+
+    def flush(self):
+        self._submit()
+
+    def close(self):
+        if self._closed:
+            return
+        self._submit()
+        self._pending.put(None)
+        self._thread.join()
+        self._closed = True
+        if self._error is not None:
+            raise RuntimeError("event log writer failed") from self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _worker(self):
+        sink = None
+        k = 0
+        try:
+            while True:
+                item = self._pending.get()
+                if item is None:
+                    break
+                cols, n = item
+                if self._error is None:
+                    if sink is None:
+                        sink = self._open()
+                    self._write(sink, k, cols, n)
+                    k += 1
+                self._free.put(cols)
+            if sink is None:
+                sink = self._open()
+            self._close_sink(sink)
+        except BaseException as e:  # surfaced to the simulation thread on the next flush/close
+            self._error = e
+            # keep draining so the producer never deadlocks on a full queue
+            while self._pending.get() is not None:
+                pass
+
+    def _open(self):
+        if self.fmt == "npz":
+            return zipfile.ZipFile(self.path, "w", zipfile.ZIP_DEFLATED)
+        return pq.ParquetWriter(self.path, self._arrow_schema(), compression="zstd")
+
+    def _write(self, sink, k, cols, n):
+        if self.fmt == "npz":
+            for name, _ in COLUMNS:
+                with sink.open(f"chunk{k:06d}/{name}.npy", "w", force_zip64=True) as f:
+                    np.lib.format.write_array(f, cols[name][:n], allow_pickle=False)
+            return
+        names = self._group_names()
+        src = cols["chosen_source"][:n]
+        table = pa.table({
+            "req_id": cols["req_id"][:n],
+            "arrival": cols["arrival"][:n],
+            "start": cols["start"][:n],
+            "finish": cols["finish"][:n],
+            "chosen_source": pa.DictionaryArray.from_arrays(
+                pa.array(src.astype(np.int32), mask=src < 0), pa.array(SOURCE_NAMES)),
+            "priority": cols["priority"][:n],
+            "group": pa.DictionaryArray.from_arrays(
+                pa.array(cols["group"][:n].astype(np.int32)), pa.array(names, type=pa.string())),
+            "dropped": cols["dropped"][:n],
+        }, schema=self._arrow_schema())
+        sink.write_table(table)
+
+    def _close_sink(self, sink):
+        if self.fmt == "npz":
+            for key, values in (("source_names", SOURCE_NAMES), ("group_names", self._group_names())):
+                with sink.open(f"{key}.npy", "w") as f:
+                    np.lib.format.write_array(f, np.array(values, dtype=str), allow_pickle=False)
+        sink.close()
+
+    def _group_names(self):
+        items = list(self.groups.items())  # snapshot: the simulation thread may add groups meanwhile
+        names = [""] * len(items)
+        for g, i in items:
+            names[i] = str(g)
+        return names
+
+    def _arrow_schema(self):
+        cat = pa.dictionary(pa.int32(), pa.string())
+        return pa.schema([
+            ("req_id", pa.int64()), ("arrival", pa.float64()), ("start", pa.float64()),
+            ("finish", pa.float64()), ("chosen_source", cat), ("priority", pa.int8()),
+            ("group", cat), ("dropped", pa.bool_()),
+        ])
+
+def read_event_log(path: str) -> Dict[str, np.ndarray]:
+    # concatenated columns; chosen_source and group are decoded to strings ("" = not dispatched)
+    if path.endswith(".parquet"):
+        if not HAVE_PYARROW:
+            raise ImportError("reading parquet event logs requires pyarrow")
+        table = pq.read_table(path)
+        out = {name: table.column(name).to_numpy(zero_copy_only=False) for name, _ in COLUMNS
+               if name not in ("chosen_source", "group")}
+        for name in ("chosen_source", "group"):
+            vals = table.column(name).cast(pa.string()).to_pylist()
+            out[name] = np.array(["" if v is None else v for v in vals], dtype=str)
+        return out
+    with np.load(path, allow_pickle=False) as z:
+        chunks = sorted({k.split("/")[0] for k in z.files if k.startswith("chunk")})
+        out = {
+            name: (np.concatenate([z[f"{c}/{name}"] for c in chunks]) if chunks else np.empty(0, dtype=dt))
+            for name, dt in COLUMNS
+        }
+        sources = np.array([""] + list(z["source_names"]), dtype=str)
+        groups = z["group_names"]
+    out["chosen_source"] = sources[out["chosen_source"].astype(np.int64) + 1]
+    out["group"] = groups[out["group"].astype(np.int64)] if len(groups) else out["group"].astype(str)
+    return out
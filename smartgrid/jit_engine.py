@@ -0,0 +1,320 @@
+import math, time
+import numpy as np
+
+from smartgrid.schedulers import FIFOScheduler, NPPSScheduler, EDFScheduler
+from smartgrid.simulation import SmartGridSim
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:  # optional accelerator; run_fast() falls back to SmartGridSim.run()
+    HAVE_NUMBA = False
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda fn: fn
+
+# scheduler kind -> heap key: FIFO (arrival, 0, ctr), NPPS (-priority, arrival, ctr), EDF (deadline, arrival, ctr)
+_KINDS = {FIFOScheduler: 0, NPPSScheduler: 1, EDFScheduler: 2}
+_SOURCES = ("renewable", "battery", "nonrenewable")
+
+# heap row layout
+_K1, _K2, _CTR, _ARR, _DL, _PRIO, _GRP = 0, 1, 2, 3, 4, 5, 6
+
+@njit(cache=True)
+def _less(h, i, j):
+    if h[i, _K1] != h[j, _K1]: return h[i, _K1] < h[j, _K1]
+    if h[i, _K2] != h[j, _K2]: return h[i, _K2] < h[j, _K2]
+    return h[i, _CTR] < h[j, _CTR]
+
+@njit(cache=True)
+def _swap(h, i, j):
+    for c in range(h.shape[1]):
+        tmp = h[i, c]; h[i, c] = h[j, c]; h[j, c] = tmp
+
+@njit(cache=True)
+def _heap_push(h, n, k1, k2, ctr, arr, dl, prio, grp):
+    if n == h.shape[0]:
+        bigger = np.empty((2 * h.shape[0], h.shape[1]))
+        bigger[:n] = h[:n]
+        h = bigger
+    h[n, _K1] = k1; h[n, _K2] = k2; h[n, _CTR] = ctr
+    h[n, _ARR] = arr; h[n, _DL] = dl; h[n, _PRIO] = prio; h[n, _GRP] = grp
+    i = n
+    while i > 0:
+        p = (i - 1) // 2
+        if _less(h, i, p):
+            _swap(h, i, p); i = p
+        else:
+            break
+    return h, n + 1
+
+@njit(cache=True)
+def _heap_pop(h, n):
+    # moves the root to row n-1 and restores the heap on rows [0, n-1)
+    n -= 1
+    _swap(h, 0, n)
+    i = 0
+    while True:
+        l = 2 * i + 1
+        if l >= n: break
+        c = l
+        if l + 1 < n and _less(h, l + 1, l): c = l + 1
+        if _less(h, c, i):
+            _swap(h, c, i); i = c
+        else:
+            break
+    return n
+
+@njit(cache=True)
+def _exp(rate):
+    if rate <= 0: return np.inf
+    return -math.log(1.0 - np.random.random()) / rate
+
+@njit(cache=True)
+def _kernel(kind, T, seed, chi, lam1, lam2, overhead_C, probs, deadline_scale, n_consumers, expire,
+            outage_rate, outage_dur):
+    np.random.seed(seed)
+    inf = np.inf
+    h = np.empty((64, 7))
+    n = 0
+    ctr = 0.0
+
+    usage = np.zeros(3)
+    prio_stats = np.zeros((4, 3))    # priority -> (wait_sum, resp_sum, n)
+    group_stats = np.zeros((2, 3))   # group A/B -> (wait_sum, resp_sum, n)
+    outage_count = np.zeros(3)
+    outage_time = np.zeros(3)
+    outage_started = np.full(3, -1.0)
+    available = np.ones(3, dtype=np.bool_)
+    processed = 0
+    wait_sum = 0.0
+    resp_sum = 0.0
+    busy_time = 0.0
+    last_busy_change = 0.0
+    drops = 0
+    late = 0
+    reroute = 0
+    arrivals = 0
+
+    busy = False
+    s_arr = s_dl = s_start = 0.0
+    s_prio = 0
+    s_grp = 0
+    s_src = -1
+
+    # one pending event of each kind is all the model ever has, so the event list is a handful of clocks
+    t_arr = _exp(chi)
+    t_dep = inf
+    t_ostart = np.full(3, inf)
+    t_oend = np.full(3, inf)
+    for k in range(3):
+        if outage_rate[k] >= 0:
+            t_ostart[k] = _exp(outage_rate[k])
+
+    now = 0.0
+    while True:
+        ev = 0
+        t = t_arr
+        if t_dep < t:
+            ev = 1; t = t_dep
+        for k in range(3):
+            if t_ostart[k] < t:
+                ev = 2 + k; t = t_ostart[k]
+            if t_oend[k] < t:
+                ev = 5 + k; t = t_oend[k]
+        if t > T:
+            break
+        now = t
+
+        start = False
+        if ev == 0:
+            arrivals += 1
+            cid = int(np.random.random() * n_consumers)
+            prio = 1 + int(np.random.random() * 3)
+            dl = now + max(0.1, -math.log(1.0 - np.random.random()) * deadline_scale if deadline_scale > 0 else 0.0)
+            grp = 0 if cid % 2 == 0 else 1
+            if kind == 0:
+                h, n = _heap_push(h, n, now, 0.0, ctr, now, dl, prio, grp)
+            elif kind == 1:
+                h, n = _heap_push(h, n, -prio, now, ctr, now, dl, prio, grp)
+            else:
+                h, n = _heap_push(h, n, dl, now, ctr, now, dl, prio, grp)
+            ctr += 1.0
+            t_arr = now + _exp(chi)
+            start = not busy
+        elif ev == 1:
+            busy_time += now - last_busy_change
+            busy = False
+            t_dep = inf
+            wait = s_start - s_arr
+            resp = now - s_arr
+            if now > s_dl:
+                late += 1
+            processed += 1
+            wait_sum += wait
+            resp_sum += resp
+            usage[s_src] += 1
+            prio_stats[s_prio, 0] += wait; prio_stats[s_prio, 1] += resp; prio_stats[s_prio, 2] += 1
+            group_stats[s_grp, 0] += wait; group_stats[s_grp, 1] += resp; group_stats[s_grp, 2] += 1
+            start = True
+        elif ev < 5:
+            k = ev - 2
+            if available[k]:
+                available[k] = False
+                outage_count[k] += 1
+                outage_started[k] = now
+                d = outage_dur[k]
+                t_oend[k] = now + (-math.log(1.0 - np.random.random()) * d if d > 0 else 0.0)
+            t_ostart[k] = now + _exp(outage_rate[k])
+        else:
+            k = ev - 5
+            t_oend[k] = inf
+            if not available[k]:
+                available[k] = True
+                if outage_started[k] >= 0:
+                    outage_time[k] += now - outage_started[k]
+                outage_started[k] = -1.0
+
+        while start and n > 0:
+            n = _heap_pop(h, n)
+            if expire and now > h[n, _DL]:
+                drops += 1
+                continue
+            tot = 0.0
+            for k in range(3):
+                if available[k] and probs[k] > 0:
+                    tot += probs[k]
+            src = 2
+            if tot > 0:
+                u = np.random.random() * tot
+                cum = 0.0
+                last = -1
+                src = -1
+                for k in range(3):
+                    if available[k] and probs[k] > 0:
+                        last = k
+                        cum += probs[k]
+                        if src < 0 and u <= cum:
+                            src = k
+                if src < 0:
+                    src = last
+            if not available[src]:
+                reroute += 1
+            busy = True
+            last_busy_change = now
+            s_arr = h[n, _ARR]; s_dl = h[n, _DL]; s_prio = int(h[n, _PRIO]); s_grp = int(h[n, _GRP])
+            s_start = now
+            s_src = src
+            service = _exp(lam1) + overhead_C + (_exp(lam2) if src < 2 else 0.0)
+            t_dep = now + service
+            start = False
+
+    if busy:
+        busy_time += max(0.0, T - last_busy_change)
+    for k in range(3):
+        if outage_started[k] >= 0:
+            outage_time[k] += max(0.0, T - outage_started[k])
+
+    return (processed, wait_sum, resp_sum, usage, busy_time, drops, late, prio_stats, group_stats,
+            outage_count, outage_time, reroute, arrivals)
+
+def _supported(sim: SmartGridSim) -> bool:
+    return (type(sim.scheduler) in _KINDS and len(sim.scheduler) == 0 and not sim.record_timeline
+            and not sim.crn and not sim.antithetic and sim.event_log is None)
+
+def _run_kernel(sim: SmartGridSim):
+    probs = np.array([sim.dispatch_probs.get(k, 0.0) for k in _SOURCES])
+    # -1 marks a source without an outage process (SmartGridSim only schedules configured ones)
+    rate = np.array([sim.outage_rate.get(k, -1.0) for k in _SOURCES])
+    dur = np.array([sim.outage_mean_duration.get(k, 10.0) for k in _SOURCES])
+    (processed, wait_sum, resp_sum, usage, busy_time, drops, late, prio_stats, group_stats,
+     outage_count, outage_time, reroute, arrivals) = _kernel(
+        _KINDS[type(sim.scheduler)], float(sim.T), int(sim.seed) % (2**32), float(sim.chi), float(sim.lam1),
+        float(sim.lam2), float(sim.overhead_C), probs, float(sim.deadline_scale), int(sim.n_consumers),
+        bool(sim.expire_on_deadline), rate, dur,
+    )
+    T = sim.T
+    total = usage.sum() or 1
+    def means(stats, keys):
+        return {
+            key: {
+                "avg_wait": float(stats[i, 0] / stats[i, 2]),
+                "avg_response": float(stats[i, 1] / stats[i, 2]),
+                "n": int(stats[i, 2]),
+            } for i, key in keys if stats[i, 2] > 0
+        }
+    outage_time_d = {k: float(outage_time[i]) for i, k in enumerate(_SOURCES)}
+    return {
+        "processed": int(processed),
+        "avg_wait": float(wait_sum / processed) if processed > 0 else 0.0,
+        "avg_response": float(resp_sum / processed) if processed > 0 else 0.0,
+        "utilization": float(busy_time / max(1e-9, T)),
+        "energy_mix": {k: float(usage[i] / total) for i, k in enumerate(_SOURCES)},
+        "queue_timeline": [],
+        "drops_deadline": int(drops),
+        "late_finish": int(late),
+        "drops_admission": 0,
+        "by_priority": means(prio_stats, [(p, p) for p in (1, 2, 3)]),
+        "by_group": means(group_stats, [(0, "A"), (1, "B")]),
+        "outage_count": {k: int(outage_count[i]) for i, k in enumerate(_SOURCES)},
+        "outage_time": outage_time_d,
+        "reroute_due_outage": int(reroute),
+        "availability": {k: float(1.0 - (outage_time_d[k] / max(T, 1e-9))) for k in _SOURCES},
+    }
+
+def run_fast(scheduler, use_jit: bool = True, **sim_kwargs):
+    # same inputs/outputs as SmartGridSim(scheduler, **sim_kwargs).run(); uses the compiled kernel for
+    # FIFO/NPPS/EDF when numba is installed, otherwise (or for other configurations) the Python engine
+    sim_kwargs.setdefault("record_timeline", False)
+    sim = SmartGridSim(scheduler=scheduler, **sim_kwargs)
+    if use_jit and HAVE_NUMBA and _supported(sim):
+        return _run_kernel(sim)
+    return sim.run()
+
+def compare_engines(sched_cls, n_reps: int = 30,
+                    metrics=("avg_wait", "avg_response", "processed", "drops_deadline", "utilization"),
+                    seed: int = 1, z_max: float = 3.0, **sim_kwargs):
+    # distributional agreement: the engines draw different random streams, so compare replication
+    # means with a Welch z statistic rather than run-by-run equality; a metric passes when |z| < z_max
+    py, jit = {m: [] for m in metrics}, {m: [] for m in metrics}
+    for i in range(n_reps):
+        a = SmartGridSim(scheduler=sched_cls(), seed=seed + i, record_timeline=False, **sim_kwargs).run()
+        b = _run_kernel(SmartGridSim(scheduler=sched_cls(), seed=seed + i, record_timeline=False, **sim_kwargs))
+        for m in metrics:
+            py[m].append(float(a[m])); jit[m].append(float(b[m]))
+    out = {}
+    for m in metrics:
+        ma, mb = np.mean(py[m]), np.mean(jit[m])
+        se = math.sqrt(np.var(py[m], ddof=1) / n_reps + np.var(jit[m], ddof=1) / n_reps)
+        z = float((mb - ma) / se) if se > 0 else 0.0
+        out[m] = {"python": float(ma), "jit": float(mb), "z": z, "passed": abs(z) < z_max}
+    return {"metrics": out, "passed": all(d["passed"] for d in out.values())}
+
+def main():
+    kw = dict(
+        T=20000.0, chi=0.35, lam1=1.5, lam2=0.5, overhead_C=0.2,
+        dispatch_probs={'renewable':0.6, 'battery':0.2, 'nonrenewable':0.2},
+        deadline_scale=5.0, n_consumers=6, expire_on_deadline=True,
+    )
+    print(f"numba available: {HAVE_NUMBA}")
+    failed = []
+    for name, cls in [("FIFO", FIFOScheduler), ("NPPS", NPPSScheduler), ("EDF", EDFScheduler)]:
+        if HAVE_NUMBA:
+            run_fast(cls(), **kw)  # compile outside the timing
+        t0 = time.perf_counter(); SmartGridSim(scheduler=cls(), record_timeline=False, **kw).run()
+        t1 = time.perf_counter(); run_fast(cls(), **kw)
+        t2 = time.perf_counter()
+        print(f"== {name} == python={t1 - t0:.3f}s fast={t2 - t1:.3f}s speedup={(t1 - t0) / max(t2 - t1, 1e-9):.1f}x")
+        if not HAVE_NUMBA:
+            continue  # the uncompiled kernel is far slower than SmartGridSim; nothing to compare
+        cmp = compare_engines(cls, n_reps=20, **kw)
+        for m, d in cmp["metrics"].items():
+            print(f"  {m}: python={d['python']:.4f} jit={d['jit']:.4f} z={d['z']:+.2f} {'ok' if d['passed'] else 'FAIL'}")
+        if not cmp["passed"]:
+            failed.append(name)
+    if failed:
+        raise SystemExit(f"engines disagree for: {', '.join(failed)}")
+
+if __name__ == "__main__":
+    main()
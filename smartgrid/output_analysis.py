@@ -0,0 +1,70 @@
+import math
+from typing import Optional, Sequence, Tuple
+
+# two-sided 95% Student-t critical values by degrees of freedom
+_T95 = {1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306, 9: 2.262,
+        10: 2.228, 11: 2.201, 12: 2.179, 13: 2.160, 14: 2.145, 15: 2.131, 16: 2.120, 17: 2.110,
+        18: 2.101, 19: 2.093, 20: 2.086, 24: 2.064, 29: 2.045, 30: 2.042, 40: 2.021, 60: 2.000,
+        120: 1.980}
+
+def t95(dof: int) -> float:
+    # untabulated dof use the largest tabulated dof below them, whose (larger) value is conservative
+    if dof < 1:
+        return float('inf')
+    return _T95[max(k for k in _T95 if k <= dof)]
+
+class OnlineSeries:
+    # incremental view of a growing observation list: prefix sums give O(1) means and batch sums, and the
+    # MSER cut is re-scanned only after the data has grown by `refresh`x (amortized O(n) overall)
+    def __init__(self, batch: int = 5, refresh: float = 1.25):
+        self.batch = batch
+        self.refresh = refresh
+        self.n = 0
+        self._cum = [0.0]                 # prefix sums of observations
+        self._zc, self._zc2 = [0.0], [0.0]  # prefix sums of batch means and of their squares
+        self._cut = 0
+        self._cut_nb = 0
+
+    def extend(self, xs: Sequence[float]):
+        # consumes xs[self.n:]; xs is the simulator's append-only series
+        cum, b = self._cum, self.batch
+        for x in xs[self.n:]:
+            cum.append(cum[-1] + x)
+            self.n += 1
+            if self.n % b == 0:
+                z = (cum[-1] - cum[-1 - b]) / b
+                self._zc.append(self._zc[-1] + z)
+                self._zc2.append(self._zc2[-1] + z * z)
+
+    def mean(self, d: int = 0) -> float:
+        k = self.n - d
+        return (self._cum[self.n] - self._cum[d]) / k if k > 0 else 0.0
+
+    def mser_cut(self, force: bool = False) -> int:
+        nb = len(self._zc) - 1
+        if nb < 2:
+            return 0
+        if not force and self._cut_nb and nb < self._cut_nb * self.refresh:
+            return self._cut
+        zc, zc2 = self._zc, self._zc2
+        best_d, best = 0, float('inf')
+        for d in range(nb // 2 + 1):
+            k = nb - d
+            s = zc[nb] - zc[d]
+            score = (zc2[nb] - zc2[d] - s * s / k) / (k * k)
+            if score < best:
+                best_d, best = d, score
+        self._cut, self._cut_nb = best_d * self.batch, nb
+        return self._cut
+
+    def batch_means(self, d: int = 0, n_batches: int = 20) -> Tuple[float, Optional[float], int]:
+        # (mean, 95% half-width or None, batch size) over observations d..n
+        mean = self.mean(d)
+        size = (self.n - d) // n_batches if n_batches > 1 else 0
+        if size < 2:
+            return mean, None, size
+        cum = self._cum
+        ys = [(cum[d + (j + 1) * size] - cum[d + j * size]) / size for j in range(n_batches)]
+        m = sum(ys) / n_batches
+        var = sum((y - m) ** 2 for y in ys) / (n_batches - 1)
+        return mean, t95(n_batches - 1) * math.sqrt(var / n_batches), size
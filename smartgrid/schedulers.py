@@ -3,6 +3,10 @@ from .models import Request
 
 class BaseScheduler:
     name = "base"
+    rejected = 0  # requests refused at push time (admission control)
+    def bind(self, sim):
+        # called by SmartGridSim.__init__ so schedulers can read the simulation parameters
+        pass
     def push(self, rq: Request):
         raise NotImplementedError
     def pop(self, now: float) -> Optional[Request]:
@@ -167,3 +171,72 @@ class WRR_NPPS_Scheduler(BaseScheduler):
 
     def __len__(self):
         return sum(len(h) for h in self.heaps.values())
+
+
+class AdmissionControlScheduler(BaseScheduler):
+    # wraps any scheduler; sheds (or downgrades) requests whose estimated completion misses the deadline
+    def __init__(self, inner: BaseScheduler, mode: str = "reject", slack: float = 1.0):
+        if mode not in ("reject", "downgrade"):
+            raise ValueError(f"unknown admission mode: {mode}")
+        self.inner = inner
+        self.name = f"AC({inner.name})"
+        self.mode = mode
+        self.slack = slack
+        # service model, filled in from the simulator by bind()
+        self.mean_service: Optional[float] = None
+        self.expire_on_deadline = True
+        # incremental backlog estimate: expected work queued in `inner` + expected end of the request in service
+        self.backlog = 0.0
+        self.busy_until = 0.0
+        # downgraded requests: FIFO lane served only when `inner` is empty, kept out of the backlog estimate
+        self._low = []
+        self._ctr = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.downgraded = 0
+
+    def bind(self, sim):
+        self.inner.bind(sim)
+        self.expire_on_deadline = sim.expire_on_deadline
+        p_src = sum(p for k, p in sim.dispatch_probs.items() if k in ('renewable', 'battery'))
+        # expected service time, same composition as SmartGridSim._start_service
+        self.mean_service = (1.0/sim.lam1 if sim.lam1 > 0 else float('inf')) + sim.overhead_C \
+            + (p_src/sim.lam2 if sim.lam2 > 0 and p_src > 0 else 0.0)
+
+    def estimated_completion(self, now: float) -> float:
+        return max(now, self.busy_until) + self.backlog + self.mean_service
+
+    def push(self, rq: Request):
+        if self.mean_service is None:
+            raise RuntimeError("AdmissionControlScheduler must be bound to a SmartGridSim before use")
+        now = rq.arrival_time
+        if self.estimated_completion(now) > now + self.slack * (rq.deadline - now):
+            if self.mode == "reject":
+                self.rejected += 1
+                return
+            self.downgraded += 1
+            heapq.heappush(self._low, (rq.arrival_time, self._ctr, rq))
+            self._ctr += 1
+            return
+        self.admitted += 1
+        self.backlog += self.mean_service
+        self.inner.push(rq)
+
+    def pop(self, now: float) -> Optional[Request]:
+        rq = self.inner.pop(now)
+        if rq is not None:
+            self.backlog = max(0.0, self.backlog - self.mean_service)
+        else:
+            self.backlog = 0.0
+            if self._low:
+                rq = heapq.heappop(self._low)[2]
+        if rq is None:
+            self.busy_until = now  # server goes idle
+            return None
+        # only requests that actually start service occupy the server; expired ones are dropped by the sim
+        if not (self.expire_on_deadline and now > rq.deadline):
+            self.busy_until = now + self.mean_service
+        return rq
+
+    def __len__(self):
+        return len(self.inner) + len(self._low)
@@ -1,8 +1,22 @@
-import heapq, math, random
-from typing import Dict, List, Tuple, Optional
+import copy, heapq, math, random
+from typing import Dict, Iterator, List, Tuple, Optional, Sequence
 from .models import Request, Consumer
+from .output_analysis import OnlineSeries
+
+class AntitheticRandom(random.Random):
+    # mirrors every uniform draw (u -> 1-u). With crn/antithetic the simulator derives all its draws
+    # (including the consumer index) from random(), so a run and its antithetic twin stay in lockstep.
+    def random(self) -> float:
+        u = super().random()
+        return 1.0 - u if u > 0.0 else 0.0
+
+def _make_rng(seed, antithetic: bool = False) -> random.Random:
+    return AntitheticRandom(seed) if antithetic else random.Random(seed)
 
 class SmartGridSim:
+    # metrics that run_iter() can estimate progressively -> per-request series they are computed from
+    _SERIES = {"avg_wait": "wait_times", "avg_response": "response_times", "avg_service": "service_times"}
+
     def __init__(
         self,
         scheduler,
@@ -19,10 +33,28 @@ class SmartGridSim:
         record_timeline: bool = True,
         outage_rate: Dict[str, float] = None,       # Poisson rate for outage starts
         outage_mean_duration: Dict[str, float] = None,  # mean duration for outages
+        crn: bool = False,          # separate RNG substreams (arrivals/service/dispatch/outages)
+        antithetic: bool = False,   # antithetic uniforms (u -> 1-u) on every stream
+        event_log=None,             # optional EventLogWriter for per-request records
     ):
         self.scheduler = scheduler
         self.T = T
-        self.rng = random.Random(seed)
+        self.seed = seed
+        self.crn = crn
+        self.antithetic = antithetic
+        # lockstep draws (consumer index from random(), lam2 always drawn) only when streams are compared;
+        # the plain single-stream path consumes random numbers exactly as before
+        self._lockstep = crn or antithetic
+        self.rng = _make_rng(seed, antithetic)
+        if crn:
+            # common random numbers: each stochastic input draws from its own stream, so
+            # different schedulers with the same seed see the same arrivals and outages
+            self.rng_arrival = _make_rng(f"{seed}:arrival", antithetic)
+            self.rng_service = _make_rng(f"{seed}:service", antithetic)
+            self.rng_dispatch = _make_rng(f"{seed}:dispatch", antithetic)
+            self.rng_outage = _make_rng(f"{seed}:outage", antithetic)
+        else:
+            self.rng_arrival = self.rng_service = self.rng_dispatch = self.rng_outage = self.rng
         self.chi = chi
         self.lam1 = lam1
         self.lam2 = lam2
@@ -35,6 +67,7 @@ class SmartGridSim:
 
         self.expire_on_deadline = expire_on_deadline
         self.record_timeline = record_timeline
+        self.event_log = event_log
 
         self.sources = ["renewable", "battery", "nonrenewable"]
         self.outage_rate = outage_rate or {"renewable": 0.002, "battery": 0.001}  # per time-unit
@@ -63,6 +96,7 @@ class SmartGridSim:
 
         # deadline miss drops
         self.deadline_drops = 0
+        self.deadline_late = 0  # served but finished after the deadline
 
         #outage state & metrics
         self.available = {k: True for k in self.sources}
@@ -73,14 +107,17 @@ class SmartGridSim:
 
         self.consumers = [Consumer(consumer_id=i) for i in range(n_consumers)]
 
-    def _exp(self, rate: float) -> float:
+        if scheduler is not None:
+            scheduler.bind(self)
+
+    def _exp(self, rate: float, rng: random.Random = None) -> float:
         if rate <= 0: return float('inf')
-        u = self.rng.random()
+        u = (rng or self.rng).random()
         return -math.log(1 - u) / rate
 
-    def _exp_mean(self, mean: float) -> float:
+    def _exp_mean(self, mean: float, rng: random.Random = None) -> float:
         if mean <= 0: return 0.0
-        u = self.rng.random()
+        u = (rng or self.rng).random()
         return -math.log(1 - u) * mean
 
     def _choice_available(self, probs: Dict[str, float]) -> str:
@@ -88,7 +125,7 @@ class SmartGridSim:
         if not eff:
             return "nonrenewable"
         tot = sum(eff.values())
-        u = self.rng.random() * tot
+        u = self.rng_dispatch.random() * tot
         cum = 0.0
         for k, p in eff.items():
             cum += p
@@ -119,6 +156,7 @@ class SmartGridSim:
         self.by_priority.clear()
         self.by_group.clear()
         self.deadline_drops = 0
+        self.deadline_late = 0
         self.available = {k: True for k in self.sources}
         self.outage_count = {k: 0 for k in self.sources}
         self.outage_time = {k: 0.0 for k in self.sources}
@@ -126,22 +164,26 @@ class SmartGridSim:
         self.reroute_due_outage = 0
 
         # first arrival
-        self._schedule(self._exp(self.chi), 'arrival', None)
+        self._schedule(self._exp(self.chi, self.rng_arrival), 'arrival', None)
         if self.record_timeline:
             self.queue_timeline.append((0.0, 0))
 
         # schedule initial outage starts for each configured source
         for src, rate in self.outage_rate.items():
-            t_start = self._exp(rate)
+            t_start = self._exp(rate, self.rng_outage)
             self._schedule(t_start, 'outage_start', src)
 
 
     def _handle_arrival(self):
-        cid = self.rng.randrange(self.n_consumers)
+        rng = self.rng_arrival
+        if self._lockstep:
+            cid = min(self.n_consumers - 1, int(rng.random() * self.n_consumers))
+        else:
+            cid = rng.randrange(self.n_consumers)
         self.req_counter += 1
-        demand = max(0.1, self.rng.gauss(1.0, 0.3))
-        priority = 1 + int(self.rng.random() * 3)  # 1..3
-        deadline = self.now + max(0.1, self._exp_mean(self.deadline_scale))
+        demand = max(0.1, rng.gauss(1.0, 0.3))
+        priority = 1 + int(rng.random() * 3)  # 1..3
+        deadline = self.now + max(0.1, self._exp_mean(self.deadline_scale, rng))
         rq = Request(
             req_id=self.req_counter,
             consumer_id=cid,
@@ -155,7 +197,7 @@ class SmartGridSim:
         if self.record_timeline:
             self.queue_timeline.append((self.now, len(self.scheduler)))
 
-        next_arrival = self.now + self._exp(self.chi)
+        next_arrival = self.now + self._exp(self.chi, rng)
         self._schedule(next_arrival, 'arrival', None)
 
         if not self.busy:
@@ -169,6 +211,8 @@ class SmartGridSim:
         # deadline expiration check
         if self.expire_on_deadline and self.now > rq.deadline:
             self.deadline_drops += 1
+            if self.event_log is not None:
+                self.event_log.record(rq, dropped=True)
             if self.record_timeline:
                 self.queue_timeline.append((self.now, len(self.scheduler)))
             self._start_service()
@@ -186,8 +230,14 @@ class SmartGridSim:
         self.last_busy_change = self.now
         rq.start_service_time = self.now
 
-        controller_proc = self._exp(self.lam1)
-        source_proc = self._exp(self.lam2) if chosen in ('renewable', 'battery') else 0.0
+        controller_proc = self._exp(self.lam1, self.rng_service)
+        if self._lockstep:
+            # both draws are always taken so the service stream advances the same way whatever the source
+            source_proc = self._exp(self.lam2, self.rng_service)
+            if chosen not in ('renewable', 'battery'):
+                source_proc = 0.0
+        else:
+            source_proc = self._exp(self.lam2, self.rng_service) if chosen in ('renewable', 'battery') else 0.0
         service_time = controller_proc + self.overhead_C + source_proc
 
         finish = self.now + service_time
@@ -205,6 +255,10 @@ class SmartGridSim:
         wait = (rq.start_service_time - rq.arrival_time) if rq.start_service_time is not None else 0.0
         service_time = self.in_service[1] if self.in_service else 0.0
         response = rq.finish_time - rq.arrival_time
+        if rq.finish_time > rq.deadline:
+            self.deadline_late += 1
+        if self.event_log is not None:
+            self.event_log.record(rq)
 
         self.wait_times.append(wait)
         self.service_times.append(service_time)
@@ -227,10 +281,10 @@ class SmartGridSim:
             self.available[src] = False
             self.outage_count[src] = self.outage_count.get(src, 0) + 1
             self._outage_started_at[src] = self.now
-            dur = self._exp_mean(self.outage_mean_duration.get(src, 10.0))
+            dur = self._exp_mean(self.outage_mean_duration.get(src, 10.0), self.rng_outage)
             self._schedule(self.now + dur, 'outage_end', src)
         rate = self.outage_rate.get(src, 0.0)
-        t_next = self.now + self._exp(rate)
+        t_next = self.now + self._exp(rate, self.rng_outage)
         self._schedule(t_next, 'outage_start', src)
 
     def _handle_outage_end(self, src: str):
@@ -241,33 +295,140 @@ class SmartGridSim:
                 self.outage_time[src] += (self.now - started)
             self._outage_started_at[src] = None
 
+    def step(self) -> bool:
+        # process the next event; False once the horizon is reached or no events are left
+        if not self.events:
+            return False
+        t, eid, kind, payload = heapq.heappop(self.events)
+        self.now = t
+        if self.now > self.T:
+            return False
+        if kind == 'arrival':
+            self._handle_arrival()
+        elif kind == 'departure':
+            self._handle_departure(payload)  # payload=Request
+        elif kind == 'outage_start':
+            self._handle_outage_start(payload)  # payload=src
+        elif kind == 'outage_end':
+            self._handle_outage_end(payload)    # payload=src
+        return True
+
+    def clone(self, light: bool = False) -> "SmartGridSim":
+        # full state snapshot (event heap, scheduler, RNG streams, metrics); reseed() a clone to branch it.
+        # the event log is not copied: clones run without one. light=True also leaves out the append-only
+        # per-request history (wait/service/response lists, timeline, per-priority/group sums), which the
+        # clone restarts empty, so the cost no longer grows with elapsed time; counters are still copied
+        memo = {id(self.event_log): None}
+        if light:
+            for hist in (self.wait_times, self.service_times, self.response_times, self.queue_timeline,
+                         self.by_priority, self.by_group):
+                memo[id(hist)] = type(hist)()
+        return copy.deepcopy(self, memo)
+
+    def reseed(self, seed):
+        self.rng.seed(seed)
+        if self.crn:
+            self.rng_arrival.seed(f"{seed}:arrival")
+            self.rng_service.seed(f"{seed}:service")
+            self.rng_dispatch.seed(f"{seed}:dispatch")
+            self.rng_outage.seed(f"{seed}:outage")
+
     def run(self):
         self.initialize()
-        while self.events:
-            t, eid, kind, payload = heapq.heappop(self.events)
-            self.now = t
-            if self.now > self.T:
-                break
-            if kind == 'arrival':
-                self._handle_arrival()
-            elif kind == 'departure':
-                self._handle_departure(payload)  # payload=Request
-            elif kind == 'outage_start':
-                self._handle_outage_start(payload)  # payload=src
-            elif kind == 'outage_end':
-                self._handle_outage_end(payload)    # payload=src
+        while self.step():
+            pass
+        return self._finalize()
+
+    def run_iter(
+        self,
+        snapshot_every: float = 100.0,
+        warmup: Optional[str] = "mser5",     # warm-up truncation rule, or None to keep everything
+        targets: Sequence[str] = ("avg_wait",),
+        rel_precision: float = 0.05,         # batch-means 95% half-width relative to the mean
+        n_batches: int = 20,
+        early_stop: bool = False,
+        min_obs: int = 1000,                 # post-warm-up observations required before convergence
+        min_batch_size: int = 50,
+    ) -> Iterator[dict]:
+        # progressive run: yields a metric snapshot every `snapshot_every` time units; the last one
+        # carries "final": True and the full run() results for the horizon actually simulated, with the
+        # target metrics replaced by their warm-up-truncated means (raw values kept as "<key>_raw")
+        for key in targets:
+            if key not in self._SERIES:
+                raise ValueError(f"unsupported target metric: {key}")
+        if warmup not in (None, "mser5"):
+            raise ValueError(f"unknown warm-up rule: {warmup}")
+        opts = (warmup, rel_precision, n_batches, min_obs, min_batch_size)
+        series = {key: OnlineSeries(batch=5) for key in targets}
+        self.initialize()
+        next_snap = snapshot_every
+        while self.step():
+            if self.now < next_snap:
+                continue
+            next_snap = (math.floor(self.now / snapshot_every) + 1) * snapshot_every
+            snap = self._snapshot(series, *opts)
+            if early_stop and snap["converged"]:
+                snap.update(final=True, stopped_early=True,
+                            results=self._truncated_results(self._finalize(t_end=self.now), snap, warmup))
+                yield snap
+                return
+            yield snap
+        snap = self._snapshot(series, *opts, force_cut=True)
+        snap.update(final=True, stopped_early=False,
+                    results=self._truncated_results(self._finalize(t_end=self.T), snap, warmup))
+        yield snap
+
+    def _snapshot(self, series, warmup, rel_precision, n_batches, min_obs, min_batch_size, force_cut=False) -> dict:
+        estimates = {}
+        converged = True
+        for key, acc in series.items():
+            acc.extend(getattr(self, self._SERIES[key]))
+            d = acc.mser_cut(force_cut) if warmup else 0
+            mean, hw, size = acc.batch_means(d, n_batches)
+            ok = (hw is not None and acc.n - d >= min_obs and size >= min_batch_size
+                  and mean != 0 and hw <= rel_precision * abs(mean))
+            converged = converged and ok
+            estimates[key] = {
+                "mean": mean,
+                "halfwidth": hw,
+                "warmup_deleted": d,
+                "raw_mean": acc.mean(),
+                "converged": ok,
+            }
+        return {
+            "time": self.now,
+            "processed": len(self.response_times),
+            "queue_len": len(self.scheduler),
+            "drops_deadline": self.deadline_drops,
+            "estimates": estimates,
+            "converged": converged,
+            "final": False,
+        }
 
+    @staticmethod
+    def _truncated_results(res: dict, snap: dict, warmup) -> dict:
+        if warmup:
+            for key, est in snap["estimates"].items():
+                res[key + "_raw"] = est["raw_mean"]
+                res[key] = est["mean"]
+            res["warmup_deleted"] = {key: est["warmup_deleted"] for key, est in snap["estimates"].items()}
+        return res
+
+    def _finalize(self, t_end: Optional[float] = None):
+        T = self.T if t_end is None else t_end
+        if self.event_log is not None:
+            self.event_log.flush()
         if self.busy:
-            self.busy_time += max(0.0, self.T - self.last_busy_change)
+            self.busy_time += max(0.0, T - self.last_busy_change)
 
         for src, t0 in self._outage_started_at.items():
             if t0 is not None:
-                self.outage_time[src] += max(0.0, self.T - t0)
+                self.outage_time[src] += max(0.0, T - t0)
 
         n = len(self.response_times)
         avg_wait = sum(self.wait_times)/n if n>0 else 0.0
         avg_resp = sum(self.response_times)/n if n>0 else 0.0
-        util = self.busy_time / max(1e-9, self.T)
+        util = self.busy_time / max(1e-9, T)
         total = sum(self.usage_counts.values()) or 1
         mix = {k: v/total for k,v in self.usage_counts.items()}
 
@@ -294,10 +455,12 @@ class SmartGridSim:
             "energy_mix": mix,
             "queue_timeline": self.queue_timeline if self.record_timeline else [],
             "drops_deadline": self.deadline_drops,
+            "late_finish": self.deadline_late,
+            "drops_admission": self.scheduler.rejected,
             "by_priority": by_priority_mean,
             "by_group": by_group_mean,
             "outage_count": self.outage_count,
             "outage_time": self.outage_time,        # total down-time per source
             "reroute_due_outage": self.reroute_due_outage,
-            "availability": {k: 1.0 - (self.outage_time.get(k,0.0)/max(self.T,1e-9)) for k in self.sources},
+            "availability": {k: 1.0 - (self.outage_time.get(k,0.0)/max(T,1e-9)) for k in self.sources},
         }
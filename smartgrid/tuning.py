@@ -0,0 +1,140 @@
+import math, pickle, random
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from smartgrid.schedulers import WRRScheduler, WRR_EDF_Scheduler, WRR_NPPS_Scheduler
+from smartgrid.simulation import SmartGridSim
+
+WRR_FAMILY = {
+    "WRR": WRRScheduler,
+    "WRR+EDF": WRR_EDF_Scheduler,
+    "WRR+NPPS": WRR_NPPS_Scheduler,
+}
+
+def percentile(xs: Sequence[float], q: float) -> float:
+    if not xs: return 0.0
+    ys = sorted(xs)
+    k = min(len(ys) - 1, max(0, int(math.ceil(q / 100.0 * len(ys))) - 1))
+    return ys[k]
+
+def p95_wait_plus_drops(res, drop_penalty: float = 10.0) -> float:
+    # p95 wait plus a penalty proportional to the fraction of requests dropped on deadline
+    offered = res["processed"] + res["drops_deadline"] + res.get("drops_admission", 0)
+    return res["p95_wait"] + drop_penalty * res["drops_deadline"] / max(1, offered)
+
+def _evaluate(args) -> float:
+    sched_cls, weights, T, seeds, sim_kwargs, objective = args
+    scores = []
+    for seed in seeds:
+        sim = SmartGridSim(scheduler=sched_cls(weights=dict(weights)), T=T, seed=seed, **sim_kwargs)
+        res = sim.run()
+        res["p95_wait"] = percentile(sim.wait_times, 95)
+        scores.append(objective(res))
+    return sum(scores) / len(scores)
+
+def _picklable(obj) -> bool:
+    try:
+        pickle.dumps(obj)
+    except Exception:
+        return False
+    return True
+
+def _map(fn, items, n_jobs: int):
+    # worker processes need picklable jobs (module-level objective, scheduler class and kwargs);
+    # anything else, e.g. a lambda objective, is evaluated serially instead of failing in the pool
+    if n_jobs <= 1 or len(items) <= 1 or not _picklable(items[0]):
+        return [fn(x) for x in items]
+    with ProcessPoolExecutor(max_workers=n_jobs) as ex:
+        return list(ex.map(fn, items))
+
+def sample_weights(groups: Sequence[str], n: int, max_weight: int = 4, seed: int = 0) -> List[Dict[str, int]]:
+    # random integer weight vectors, reduced by their gcd so (4,2) and (2,1) count once
+    rng = random.Random(seed)
+    space = max_weight ** len(groups)
+    seen, out = set(), []
+    attempts = 0
+    while len(out) < n and attempts < 20 * max(n, space):
+        attempts += 1
+        w = [rng.randint(1, max_weight) for _ in groups]
+        g = reduce(math.gcd, w)
+        key = tuple(x // g for x in w)
+        if key in seen:
+            continue
+        seen.add(key)
+        out.append(dict(zip(groups, key)))
+    return out
+
+def successive_halving(
+    sched_cls,
+    candidates: List[Dict[str, int]],
+    objective: Callable = p95_wait_plus_drops,
+    T_min: float = 100.0,
+    T_max: float = 2700.0,
+    eta: int = 3,
+    seeds: Sequence[int] = (1, 2, 3),
+    n_jobs: int = 1,
+    n_rungs: int = None,
+    **sim_kwargs,
+):
+    # evaluate all candidates on a short horizon, keep the best 1/eta, grow T by eta; survivors are always
+    # promoted to the final rung, which runs at exactly T_max
+    alive = list(candidates)
+    history: List[Tuple[float, List[Tuple[Dict[str, int], float]]]] = []
+    if n_rungs is None:
+        n_rungs = 1 + max(0, int(math.ceil(math.log(T_max / T_min, eta) - 1e-9))) if T_min < T_max else 1
+    for rung in range(n_rungs):
+        T = T_max if rung == n_rungs - 1 else T_min * eta ** rung
+        jobs = [(sched_cls, w, T, tuple(seeds), sim_kwargs, objective) for w in alive]
+        scores = _map(_evaluate, jobs, n_jobs)
+        ranked = sorted(zip(alive, scores), key=lambda x: x[1])
+        history.append((T, ranked))
+        alive = [w for w, _ in ranked[:max(1, len(ranked) // eta)]]
+    best_w, best_score = ranked[0]
+    return {"best_weights": best_w, "best_score": best_score, "best_T": T, "rungs": n_rungs, "history": history}
+
+def hyperband(
+    sched_cls,
+    groups: Sequence[str] = ("A", "B"),
+    objective: Callable = p95_wait_plus_drops,
+    T_min: float = 100.0,
+    T_max: float = 2700.0,
+    eta: int = 3,
+    max_weight: int = 4,
+    seeds: Sequence[int] = (1, 2, 3),
+    seed: int = 0,
+    n_jobs: int = 1,
+    **sim_kwargs,
+):
+    # brackets trade candidate count against starting horizon; every bracket ends at T_max, so their
+    # final scores are directly comparable
+    s_max = max(0, int(math.floor(math.log(T_max / T_min, eta) + 1e-9)))
+    brackets = []
+    best = None
+    for s in range(s_max, -1, -1):
+        n = int(math.ceil((s_max + 1) / (s + 1) * eta ** s))
+        cands = sample_weights(groups, n, max_weight=max_weight, seed=seed + s)
+        out = successive_halving(
+            sched_cls, cands, objective=objective, T_min=T_max / eta ** s, T_max=T_max,
+            eta=eta, seeds=seeds, n_jobs=n_jobs, n_rungs=s + 1, **sim_kwargs,
+        )
+        brackets.append(out)
+        if best is None or out["best_score"] < best["best_score"]:
+            best = out
+    return {"best_weights": best["best_weights"], "best_score": best["best_score"], "brackets": brackets}
+
+def main():
+    kw = dict(
+        chi=0.8, lam1=1.5, lam2=0.5, overhead_C=0.2,
+        dispatch_probs={'renewable':0.6, 'battery':0.2, 'nonrenewable':0.2},
+        deadline_scale=5.0, n_consumers=6, expire_on_deadline=True, record_timeline=False,
+    )
+    for name, cls in WRR_FAMILY.items():
+        out = hyperband(cls, groups=("A", "B"), T_min=100.0, T_max=2700.0, eta=3, max_weight=6, n_jobs=4, **kw)
+        n_runs = sum(len(r) for b in out["brackets"] for _, r in b["history"])
+        print(f"== {name} ==")
+        print(f"best_weights={out['best_weights']}, objective={out['best_score']:.3f}, evaluations={n_runs}")
+        print()
+
+if __name__ == "__main__":
+    main()
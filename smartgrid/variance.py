@@ -0,0 +1,153 @@
+import numpy as np
+from typing import Callable, Dict, Sequence
+
+from smartgrid.schedulers import FIFOScheduler, NPPSScheduler, EDFScheduler, WRRScheduler
+from smartgrid.simulation import SmartGridSim
+
+def _run(make_scheduler, seed, crn, antithetic, metric, sim_kwargs):
+    sim = SmartGridSim(scheduler=make_scheduler(), seed=seed, crn=crn, antithetic=antithetic, **sim_kwargs)
+    res = sim.run()
+    n = len(sim.service_times)
+    controls = {
+        "arrivals": float(sim.req_counter),
+        "service": (sum(sim.service_times) / n) if n else 0.0,
+    }
+    return float(res[metric]), controls
+
+def control_expectations(sim_kwargs, controls: Sequence[str]) -> np.ndarray:
+    # known means of the control variates; "service" assumes full source availability,
+    # so leave it out when outages shift the dispatch mix noticeably
+    ref = SmartGridSim(scheduler=None, **sim_kwargs)
+    p_src = ref.dispatch_probs.get('renewable', 0.0) + ref.dispatch_probs.get('battery', 0.0)
+    known = {
+        "arrivals": ref.chi * ref.T,
+        "service": 1.0 / ref.lam1 + ref.overhead_C + p_src / ref.lam2,
+    }
+    return np.array([known[c] for c in controls], dtype=float)
+
+def cv_adjust(y: np.ndarray, C: np.ndarray, mu: np.ndarray):
+    # regression-adjusted observations y - (C - mu) beta; beta fitted by least squares
+    if C.shape[1] == 0 or len(y) <= C.shape[1] + 1:
+        return y, np.zeros(C.shape[1])
+    Z = C - C.mean(axis=0)
+    beta, *_ = np.linalg.lstsq(Z, y - y.mean(), rcond=None)
+    return y - (C - mu) @ beta, beta
+
+def _summary(obs: np.ndarray, runs_per_obs: int, naive_var: float, n_controls: int):
+    n = len(obs)
+    dof = max(1, n - 1 - n_controls)
+    var = float(((obs - obs.mean()) ** 2).sum() / dof)
+    se = (var / n) ** 0.5
+    per_run = var * runs_per_obs
+    vrf = (naive_var / per_run) if per_run > 0 else float('inf')
+    return {
+        "mean": float(obs.mean()),
+        "std_error": se,
+        "ci95": (float(obs.mean()) - 1.96 * se, float(obs.mean()) + 1.96 * se),
+        "vrf": vrf,  # variance reduction factor vs. independent runs at equal run count
+    }
+
+def compare_policies(
+    factories: Dict[str, Callable],
+    n_reps: int = 20,
+    metric: str = "avg_wait",
+    baseline: str = None,
+    crn: bool = True,
+    antithetic: bool = False,
+    controls: Sequence[str] = ("arrivals", "service"),
+    seed: int = 1,
+    **sim_kwargs,
+):
+    names = list(factories)
+    baseline = baseline or names[0]
+    controls = tuple(controls)
+    mu = control_expectations(sim_kwargs, controls)
+    runs_per_obs = 2 if antithetic else 1
+
+    Y = {n: [] for n in names}          # one observation per replication (antithetic pair averaged)
+    raw = {n: [] for n in names}        # every individual run, for the independent-runs baseline
+    C = {n: [] for n in names}
+    for i in range(n_reps):
+        for j, name in enumerate(names):
+            # without CRN, policies get disjoint seeds so the runs are truly independent
+            s = seed + i if crn else seed + i + 1_000_003 * j
+            y, c = _run(factories[name], s, crn, False, metric, sim_kwargs)
+            ys, cs = [y], [c]
+            if antithetic:
+                y2, c2 = _run(factories[name], s, crn, True, metric, sim_kwargs)
+                ys.append(y2); cs.append(c2)
+            raw[name] += ys
+            Y[name].append(sum(ys) / len(ys))
+            C[name].append([sum(c[k] for c in cs) / len(cs) for k in controls])
+
+    Y = {n: np.array(v) for n, v in Y.items()}
+    C = {n: np.array(v, dtype=float).reshape(n_reps, len(controls)) for n, v in C.items()}
+    naive = {n: float(np.var(raw[n], ddof=1)) if len(raw[n]) > 1 else 0.0 for n in names}
+
+    policies = {}
+    for n in names:
+        adj, beta = cv_adjust(Y[n], C[n], mu)
+        policies[n] = _summary(adj, runs_per_obs, naive[n], len(controls))
+        policies[n]["beta"] = beta.tolist()
+
+    differences = {}
+    for n in names:
+        if n == baseline:
+            continue
+        d = Y[n] - Y[baseline]
+        # under CRN both policies share the arrival stream, so pooled controls are used for the pair
+        Cd = (C[n] + C[baseline]) / 2.0
+        adj, beta = cv_adjust(d, Cd, mu)
+        differences[n] = _summary(adj, runs_per_obs, naive[n] + naive[baseline], len(controls))
+        differences[n]["beta"] = beta.tolist()
+
+    return {
+        "metric": metric,
+        "baseline": baseline,
+        "runs": n_reps * runs_per_obs * len(names),
+        "policies": policies,
+        "differences": differences,
+    }
+
+def check_antithetic(n_pairs: int = 100, T: float = 2000.0, chi: float = 0.8, seed: int = 1):
+    # sanity check on a plain M/G/1 (single source, no outages, no expiry): a run and its antithetic twin
+    # must be negatively correlated in arrival count and avg_wait, otherwise the streams are out of sync
+    kw = dict(T=T, chi=chi, dispatch_probs={'nonrenewable': 1.0}, outage_rate={'renewable': 0.0},
+              expire_on_deadline=False, record_timeline=False)
+    obs = {"arrivals": ([], []), "avg_wait": ([], [])}
+    for i in range(n_pairs):
+        for k, anti in enumerate((False, True)):
+            y, c = _run(FIFOScheduler, seed + i, True, anti, "avg_wait", kw)
+            obs["arrivals"][k].append(c["arrivals"])
+            obs["avg_wait"][k].append(y)
+    corr = {m: float(np.corrcoef(a, b)[0, 1]) for m, (a, b) in obs.items()}
+    return {"corr": corr, "ok": all(v < 0 for v in corr.values())}
+
+def main():
+    chk = check_antithetic()
+    print(f"antithetic M/G/1 check: corr={chk['corr']}, ok={chk['ok']}")
+    print()
+    factories = {
+        "FIFO": lambda: FIFOScheduler(),
+        "NPPS": lambda: NPPSScheduler(),
+        "EDF":  lambda: EDFScheduler(),
+        "WRR":  lambda: WRRScheduler(weights={"A":2, "B":1}),
+    }
+    kw = dict(
+        T=1000.0, chi=0.8, lam1=1.5, lam2=0.5, overhead_C=0.2,
+        dispatch_probs={'renewable':0.6, 'battery':0.2, 'nonrenewable':0.2},
+        deadline_scale=5.0, n_consumers=6, expire_on_deadline=True, record_timeline=False,
+    )
+    for label, opts in [
+        ("independent", dict(crn=False, antithetic=False, controls=())),
+        ("CRN", dict(crn=True, antithetic=False, controls=())),
+        ("CRN+antithetic+CV", dict(crn=True, antithetic=True, controls=("arrivals", "service"))),
+    ]:
+        out = compare_policies(factories, n_reps=20, metric="avg_wait", **opts, **kw)
+        print(f"== {label} (runs={out['runs']}) ==")
+        for n, d in out["differences"].items():
+            print(f"{n} - {out['baseline']}: {d['mean']:+.3f} ± {1.96*d['std_error']:.3f}  VRF={d['vrf']:.1f}")
+        print()
+
+if __name__ == "__main__":
+    main()